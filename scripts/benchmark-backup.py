@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+
+"""
+Backup I/O Benchmark
+Generates a synthetic project and measures backup-project.py across formats,
+copy strategies, thread counts and cold/warm page cache
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import json
+import math
+import os
+import platform
+import random
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+BACKUP_SCRIPT = Path(__file__).resolve().parent / "backup-project.py"
+PROJECT_DIR_NAME = "bench-project"
+
+TSX_TEMPLATE = """import {{ useState }} from 'react'
+import {{ Button }} from '@/components/ui/button'
+
+export function {name}({{ title }}: {{ title: string }}) {{
+  const [open, setOpen] = useState(false)
+  return (
+    <section className="flex flex-col gap-4 p-6">
+      <h2 className="text-lg font-semibold">{{title}}</h2>
+      <Button onClick={{() => setOpen(!open)}}>{{open ? 'Hide' : 'Show'}}</Button>
+    </section>
+  )
+}}
+"""
+
+
+def load_backup_module():
+    """Import backup-project.py, whose file name is not a valid module name"""
+    spec = importlib.util.spec_from_file_location("backup_project", BACKUP_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def parse_size(text: str) -> int:
+    """Parse sizes like 512, 64K, 16M or 1G"""
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    text = text.strip().upper().rstrip("B")
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def parse_list(text: str) -> List[str]:
+    return [item.strip() for item in text.split(",") if item.strip()]
+
+
+@dataclass
+class ProjectSpec:
+    """Shape of the synthetic project: many small sources plus a few large assets"""
+    small_files: int = 5000
+    small_min: int = 256
+    small_max: int = 16 * 1024
+    large_files: int = 4
+    large_size: int = 64 * 1024 * 1024
+    excluded_files: int = 500
+    files_per_dir: int = 25
+    seed: int = 42
+
+
+def generate_project(root: Path, spec: ProjectSpec) -> Tuple[int, int]:
+    """Write the synthetic project, returning (files, bytes) a backup should copy"""
+    rng = random.Random(spec.seed)
+    root.mkdir(parents=True)
+    files = 0
+    total_bytes = 0
+
+    def write(relative: str, data: bytes, counted: bool = True):
+        nonlocal files, total_bytes
+        path = root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        if counted:
+            files += 1
+            total_bytes += len(data)
+
+    write("CLAUDE.md", b"# Benchmark project\n")
+    write("package.json", json.dumps({"name": "bench-project", "version": "0.0.0"}).encode())
+
+    # Small sources: log-uniform sizes, unique content so the CAS cannot dedupe them
+    low, high = math.log(spec.small_min), math.log(max(spec.small_min, spec.small_max))
+    for i in range(spec.small_files):
+        relative = f"src/components/group{i // spec.files_per_dir:04d}/Component{i}.tsx"
+        size = int(math.exp(rng.uniform(low, high)))
+        body = f"// {relative}\n" + TSX_TEMPLATE.format(name=f"Component{i}")
+        data = (body * (size // len(body) + 1)).encode()[:size]
+        write(relative, data)
+
+    # Large assets: incompressible, written in chunks to bound memory
+    for i in range(spec.large_files):
+        path = root / f"public/assets/asset{i}.bin"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as f:
+            remaining = spec.large_size
+            while remaining > 0:
+                chunk = min(remaining, 4 * 1024 * 1024)
+                f.write(rng.randbytes(chunk))
+                remaining -= chunk
+        files += 1
+        total_bytes += spec.large_size
+
+    # Dependencies the backup must skip, to keep exclusion cost in the picture
+    for i in range(spec.excluded_files):
+        write(f"node_modules/pkg{i % 50}/index{i}.js", b"module.exports = {}\n" * 8, counted=False)
+
+    return files, total_bytes
+
+
+def evict_page_cache(root: Path) -> str:
+    """Drop cached file data for root, returning the method that worked"""
+    os.sync()
+    try:
+        with open("/proc/sys/vm/drop_caches", 'w') as f:
+            f.write("3\n")
+        return "drop_caches"
+    except OSError:
+        pass
+    # Unprivileged fallback: clean pages of each file can still be dropped
+    for dirpath, _, file_names in os.walk(root):
+        for name in file_names:
+            fd = os.open(os.path.join(dirpath, name), os.O_RDONLY)
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            finally:
+                os.close(fd)
+    return "fadvise"
+
+
+def warm_page_cache(root: Path) -> str:
+    """Read every file once so the run starts with a hot cache"""
+    for dirpath, _, file_names in os.walk(root):
+        for name in file_names:
+            with open(os.path.join(dirpath, name), 'rb') as f:
+                while f.read(1024 * 1024):
+                    pass
+    return "read"
+
+
+def read_proc_io() -> Dict[str, int]:
+    """Read this process's I/O counters (Linux only)"""
+    try:
+        with open("/proc/self/io", 'r') as f:
+            return {key: int(value) for key, value in
+                    (line.split(":") for line in f if ":" in line)}
+    except OSError:
+        return {}
+
+
+def clean_outputs(workdir: Path):
+    """Remove everything a previous run produced next to the project"""
+    for path in workdir.iterdir():
+        if path.name == PROJECT_DIR_NAME:
+            continue
+        if path.is_dir() and not path.is_symlink():
+            shutil.rmtree(path)
+        else:
+            path.unlink()
+
+
+def run_case(case: dict) -> dict:
+    """Run one backup in this process and measure it (executed in a worker process)"""
+    module = load_backup_module()
+    project = Path(case["project"])
+    cache_method = (evict_page_cache if case["cache"] == "cold" else warm_page_cache)(project)
+
+    backup = module.ProjectBackup(
+        str(project), backup_format=case["format"], jobs=case["jobs"],
+        copy_strategy=case["strategy"], hash_content=case["hash"],
+        retention=module.RetentionPolicy(last=1000), prune_in_background=False,
+        show_progress=False, read_order=case["read_order"]
+    )
+    io_before = read_proc_io()
+    times_before = os.times()
+    started = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        ok = backup.create_backup()
+    seconds = time.perf_counter() - started
+    times_after = os.times()
+    io_after = read_proc_io()
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+
+    return {
+        "ok": ok,
+        "seconds": seconds,
+        "user_cpu": times_after.user - times_before.user,
+        "system_cpu": times_after.system - times_before.system,
+        "read_syscalls": io_after.get("syscr", 0) - io_before.get("syscr", 0),
+        "write_syscalls": io_after.get("syscw", 0) - io_before.get("syscw", 0),
+        "bytes_read": io_after.get("read_bytes", 0) - io_before.get("read_bytes", 0),
+        "bytes_written": io_after.get("write_bytes", 0) - io_before.get("write_bytes", 0),
+        "peak_rss_mb": usage.ru_maxrss / 1024,
+        "context_switches": usage.ru_nvcsw + usage.ru_nivcsw,
+        "cache_method": cache_method,
+    }
+
+
+def count_syscalls(strace_output: Path) -> Optional[int]:
+    """Sum the calls column of an `strace -c` summary"""
+    try:
+        lines = strace_output.read_text().splitlines()
+    except OSError:
+        return None
+    total = 0
+    for line in lines:
+        tokens = line.split()
+        if len(tokens) >= 5 and tokens[0].replace(".", "").isdigit() and tokens[-1] != "total":
+            total += int(tokens[3])
+    return total
+
+
+def spawn_case(case: dict, use_strace: bool) -> dict:
+    """Run a case in a fresh interpreter so peak memory and counters are its own"""
+    command = [sys.executable, str(Path(__file__).resolve()), "--worker", json.dumps(case)]
+    strace_output = None
+    if use_strace:
+        strace_output = Path(case["project"]).parent / "strace.txt"
+        command = ["strace", "-f", "-c", "-qq", "-o", str(strace_output), *command]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        return {"ok": False, "error": completed.stderr.strip().splitlines()[-1:] or "failed"}
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    if strace_output is not None:
+        result["syscalls"] = count_syscalls(strace_output)
+        strace_output.unlink(missing_ok=True)
+    return result
+
+
+def build_cases(args, formats: List[str], strategies: List[str]) -> List[dict]:
+    """Expand the requested matrix; only directory backups use the copy strategy"""
+    cases = []
+    for backup_format in formats:
+        for strategy in (strategies if backup_format == "dir" else ["auto"]):
+            for jobs in map(int, parse_list(args.jobs)):
+                for hash_mode in parse_list(args.hash):
+                    for cache in parse_list(args.cache):
+                        for read_order in parse_list(args.read_orders):
+                            cases.append({"format": backup_format, "strategy": strategy,
+                                          "jobs": jobs, "hash": hash_mode == "on", "cache": cache,
+                                          "read_order": read_order})
+    return cases
+
+
+def summarize(case: dict, samples: List[dict], files: int, total_bytes: int) -> dict:
+    """Reduce repeated samples to the median run"""
+    good = [sample for sample in samples if sample.get("ok")]
+    result = dict(case, samples=samples, ok=bool(good) and len(good) == len(samples))
+    if not good:
+        return result
+    median = sorted(good, key=lambda sample: sample["seconds"])[len(good) // 2]
+    result.update({key: value for key, value in median.items() if key != "ok"})
+    result["seconds_stdev"] = statistics.pstdev(sample["seconds"] for sample in good)
+    result["files_per_s"] = files / median["seconds"]
+    result["mb_per_s"] = total_bytes / (1024 * 1024) / median["seconds"]
+    return result
+
+
+def print_table(results: List[dict]):
+    header = (f"{'format':<8} {'strategy':<16} {'jobs':>4} {'hash':<4} {'cache':<5} {'order':<6} "
+              f"{'files/s':>9} {'MB/s':>8} {'sec':>7} {'rd sc':>8} {'wr sc':>8} "
+              f"{'syscalls':>9} {'peak MB':>8}")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        label = (f"{r['format']:<8} {r['strategy']:<16} {r['jobs']:>4} "
+                 f"{'on' if r['hash'] else 'off':<4} {r['cache']:<5} {r['read_order']:<6} ")
+        if not r["ok"]:
+            print(label + "FAILED " + str(r["samples"][-1].get("error", "")))
+            continue
+        syscalls = r.get("syscalls")
+        print(label + f"{r['files_per_s']:>9.0f} {r['mb_per_s']:>8.1f} {r['seconds']:>7.2f} "
+                      f"{r['read_syscalls']:>8} {r['write_syscalls']:>8} "
+                      f"{syscalls if syscalls is not None else '-':>9} {r['peak_rss_mb']:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark backup-project.py on a synthetic project"
+    )
+    parser.add_argument("--workdir", help="Directory to create the benchmark directory in "
+                        "(default: the system temp dir; use one on the disk you care about)")
+    parser.add_argument("--small-files", type=int, default=ProjectSpec.small_files)
+    parser.add_argument("--small-size", default="256-16K",
+                        help="Size range of small files, log-uniformly distributed (default: 256-16K)")
+    parser.add_argument("--large-files", type=int, default=ProjectSpec.large_files)
+    parser.add_argument("--large-size", default="64M", help="Size of each large asset (default: 64M)")
+    parser.add_argument("--excluded-files", type=int, default=ProjectSpec.excluded_files,
+                        help="Files generated under node_modules, which the backup must skip")
+    parser.add_argument("--seed", type=int, default=ProjectSpec.seed)
+    parser.add_argument("--formats", default="dir,cas,tar.gz,tar.zst",
+                        help="Comma-separated backup formats (default: dir,cas,tar.gz,tar.zst)")
+    parser.add_argument("--strategies", default="auto,reflink,copy_file_range,sendfile,userspace",
+                        help="Comma-separated copy strategies for directory backups")
+    parser.add_argument("--jobs", default=f"1,4,{os.cpu_count() or 4}",
+                        help="Comma-separated thread counts")
+    parser.add_argument("--hash", default="on,off", help="Content hashing modes to run: on,off")
+    parser.add_argument("--cache", default="cold,warm", help="Page cache states to run: cold,warm")
+    parser.add_argument("--read-orders", default="walk,extent",
+                        help="Source read orders to run: walk,inode,extent,auto")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per case; the median is reported")
+    parser.add_argument("--strace", action="store_true",
+                        help="Count every syscall with strace -c (slows the runs down)")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated project")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_case(json.loads(args.worker))))
+        return
+
+    small_min, _, small_max = args.small_size.partition("-")
+    spec = ProjectSpec(small_files=args.small_files, small_min=parse_size(small_min),
+                       small_max=parse_size(small_max or small_min),
+                       large_files=args.large_files, large_size=parse_size(args.large_size),
+                       excluded_files=args.excluded_files, seed=args.seed)
+
+    module = load_backup_module()
+    formats = parse_list(args.formats)
+    if "tar.zst" in formats and module.zstandard is None:
+        print("Skipping tar.zst: the zstandard package is not installed", file=sys.stderr)
+        formats.remove("tar.zst")
+    if args.strace and shutil.which("strace") is None:
+        parser.error("--strace requires strace to be installed")
+
+    # Backups land next to the project, so give each benchmark its own directory
+    if args.workdir:
+        Path(args.workdir).mkdir(parents=True, exist_ok=True)
+    workdir = Path(tempfile.mkdtemp(prefix="backup-bench-", dir=args.workdir)).resolve()
+    project = workdir / PROJECT_DIR_NAME
+    try:
+        print(f"Generating project in {project}...", file=sys.stderr)
+        files, total_bytes = generate_project(project, spec)
+        print(f"{files} files, {total_bytes / (1024 * 1024):.1f}MB to back up", file=sys.stderr)
+
+        results = []
+        for case in build_cases(args, formats, parse_list(args.strategies)):
+            samples = []
+            for _ in range(args.repeat):
+                clean_outputs(workdir)
+                samples.append(spawn_case(dict(case, project=str(project)), args.strace))
+            results.append(summarize(case, samples, files, total_bytes))
+            print(f"  {case} done", file=sys.stderr)
+        clean_outputs(workdir)
+
+        print_table(results)
+
+        if args.json:
+            report = {
+                "created": datetime.now().isoformat(timespec='seconds'),
+                "host": {
+                    "platform": platform.platform(),
+                    "python": platform.python_version(),
+                    "cpu_count": os.cpu_count(),
+                },
+                "workdir": str(workdir),
+                "project": dict(asdict(spec), files=files, total_bytes=total_bytes),
+                "results": results,
+            }
+            with open(args.json, 'w') as f:
+                json.dump(report, f, indent=2)
+            print(f"Results written to {args.json}", file=sys.stderr)
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()